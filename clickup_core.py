@@ -0,0 +1,432 @@
+# clickup_core.py
+# Shared ClickUp / Discord helpers used by the reminder entrypoints.
+
+import json, os, re, sys, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, tzinfo
+from operator import itemgetter
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson  # optional: faster JSON decoding of ClickUp pages
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+__all__ = [
+    "API_BASE",
+    "set_clickup_token",
+    "close_session",
+    "load_dotenv",
+    "env_bool",
+    "get_my_user_id",
+    "get_teams",
+    "fetch_due_tasks",
+    "human_label_and_dt",
+    "window_tasks",
+    "ai_summarize_tasks",
+    "build_discord_message",
+    "send_discord_message",
+]
+
+API_BASE = "https://api.clickup.com/api/v2"
+
+_WEEKDAY = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")  # avoids per-task strftime('%a')
+_due_key = itemgetter("_due_int")  # sort key; _due_int is set by window_tasks
+
+# Shared keep-alive session for ClickUp + Discord (reuses TCP/TLS connections).
+# Transient 429/5xx on GETs are retried with backoff; raise_on_status=False
+# hands the last response back so callers keep their own status handling.
+# The Discord webhook POST is not idempotent, so it only retries on 429
+# (see send_discord_message).
+_RETRY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=("GET",),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=_RETRY))
+
+def set_clickup_token(token: str):
+    _SESSION.headers["Authorization"] = token
+
+def close_session():
+    _SESSION.close()
+
+# ---------- .env loader ----------
+def load_dotenv(path: str = ".env"):
+    try:
+        with open(path, "rb") as f:
+            buf = f.read()
+    except FileNotFoundError:
+        return
+    updates = {}
+    for line in buf.splitlines():
+        line = line.strip()
+        if not line or line.startswith(b"#") or b"=" not in line:
+            continue
+        k, v = line.split(b"=", 1)
+        updates.setdefault(k.strip().decode("utf-8"), v.strip().decode("utf-8"))
+    for k, v in updates.items():
+        os.environ.setdefault(k, v)
+
+def env_bool(name: str, default: bool = False) -> bool:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "y", "on")
+
+# ---------- ClickUp helpers ----------
+def get_my_user_id():
+    resp = _SESSION.get(f"{API_BASE}/user", timeout=30)
+    resp.raise_for_status()
+    return _loads(resp.content)["user"]["id"]
+
+def get_teams():
+    resp = _SESSION.get(f"{API_BASE}/team", timeout=30)
+    resp.raise_for_status()
+    return _loads(resp.content).get("teams", [])
+
+def _fetch_task_page(team_id, params, page):
+    resp = _SESSION.get(f"{API_BASE}/team/{team_id}/task", params={**params, "page": page}, timeout=60)
+    resp.raise_for_status()
+    return _loads(resp.content).get("tasks", [])
+
+def _due_ms(t):
+    try:
+        return int(t["due_date"])
+    except Exception:
+        return None
+
+def _page_is_last(batch, page_limit, due_end_ms) -> bool:
+    # Short page, or (assuming ascending order_by=due_date) every dated task
+    # on the page is already past the window
+    if len(batch) < page_limit:
+        return True
+    dues = [due for due in map(_due_ms, batch) if due is not None]
+    return bool(dues) and min(dues) > due_end_ms
+
+def fetch_due_tasks(team_id, due_start_ms, due_end_ms, assignee_id=None, include_closed=False, page_limit=100, workers=4):
+    """Fetch tasks with due_date between [due_start_ms, due_end_ms].
+
+    The window is pushed to ClickUp via date_due_gt/date_due_lt (exclusive
+    bounds, hence the +-1) and re-checked client-side as a safety net.
+    Page 0 is fetched on its own; only if it is full are the following
+    pages requested `workers` at a time, ordered by due date. The walk stops
+    at the first page that is short or lies entirely past due_end_ms.
+    That early stop assumes ClickUp honours ascending due-date order; the
+    per-task range check does not depend on ordering.
+    """
+    params = {
+        "include_closed": "true" if include_closed else "false",
+        "subtasks": "true",
+        "date_due_gt": due_start_ms - 1,
+        "date_due_lt": due_end_ms + 1,
+        "order_by": "due_date",
+        "reverse": "false",
+    }
+    if assignee_id:
+        params["assignees[]"] = str(assignee_id)
+
+    # Page 0 alone first: with the server-side window it is usually the only page
+    batches = {0: _fetch_task_page(team_id, params, 0)}
+    last_page = 0 if _page_is_last(batches[0], page_limit, due_end_ms) else None
+    page = 1
+    if last_page is None:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while last_page is None:
+                futures = {pool.submit(_fetch_task_page, team_id, params, p): p for p in range(page, page + workers)}
+                for fut in as_completed(futures):
+                    p = futures[fut]
+                    batch = fut.result()
+                    batches[p] = batch
+                    if _page_is_last(batch, page_limit, due_end_ms) and (last_page is None or p < last_page):
+                        last_page = p
+                page += workers
+
+    tasks = []
+    for p in range(last_page + 1):
+        for t in batches[p]:
+            due = _due_ms(t)
+            if due is None or not (due_start_ms <= due <= due_end_ms):
+                continue
+            tasks.append(t)
+
+    return tasks
+
+def human_label_and_dt(due_ms: int, today_date: date, tz: tzinfo):
+    due_dt = datetime.fromtimestamp(due_ms / 1000, tz)
+    delta_days = (due_dt.date() - today_date).days
+    if delta_days < 0:
+        label = f"overdue ({abs(delta_days)}d)"
+    elif delta_days == 0:
+        label = "today"
+    elif delta_days == 1:
+        label = "tomorrow"
+    else:
+        label = f"in {delta_days} days"
+    return label, due_dt
+
+def _iso_date(d) -> str:
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d}"
+
+def _compute_is_exam(t) -> bool:
+    # Uses ClickUp "tags" (not custom field) to detect exams
+    tags = t.get("tags", [])
+    return any((tg.get("name") or "").lower() == "exam" for tg in tags)
+
+def _format_tags(t) -> str:
+    return " ".join("#" + (tg.get("name") or "") for tg in t.get("tags") or ()) or "-"
+
+def _is_exam_task(t) -> bool:
+    # Cached on the task dict at ingest time (see window_tasks)
+    is_exam = t.get("_is_exam")
+    if is_exam is None:
+        is_exam = t["_is_exam"] = _compute_is_exam(t)
+    return is_exam
+
+def _within(due_ms: int, end_ms: int) -> bool:
+    return due_ms <= end_ms
+
+def _emit_task(parts, t, today_date: date, tz: tzinfo):
+    """Append one task block to `parts` (no trailing newline)."""
+    label, due_dt = human_label_and_dt(t["_due_int"], today_date, tz)
+    weekday = _WEEKDAY[due_dt.weekday()]  # Mon/Tue/Wed
+    name = t.get("name", "(no title)")
+    url = t.get("url") or f"https://app.clickup.com/t/{t.get('id')}"
+    status = t.get("status", {}).get("status", "unknown")
+    tags_str = t.get("_tags_str")  # cached at ingest (see window_tasks)
+    if tags_str is None:
+        tags_str = t["_tags_str"] = _format_tags(t)
+    icon = "🎓" if _is_exam_task(t) else "📝"
+    parts.extend((
+        icon, " ", str(name),
+        "\n   • Status: ", str(status),
+        "\n   • Tags: ", tags_str,
+        "\n   • Due: ", label, " (", _iso_date(due_dt), " ", weekday, ")",
+        "\n   • Link: <", url, ">",
+    ))
+
+def _emit_section(parts, cuts, tasks, today_date: date, tz: tzinfo):
+    # Records a cut before every task after the first, so each block can be
+    # sent as a unit (the section header stays with its first task)
+    if not tasks:
+        parts.append("   • None")
+        return
+    for i, t in enumerate(tasks):
+        if i:
+            cuts.append(len(parts))
+            parts.append("\n\n")
+        _emit_task(parts, t, today_date, tz)
+
+def window_tasks(all_tasks, end_ms_other: int, end_ms_exam: int):
+    """Cache _due_int/_is_exam/_tags_str on each task and keep those inside their window."""
+    merged = []
+    for t in all_tasks:
+        try:
+            due = t["_due_int"] = int(t["due_date"])
+        except Exception:
+            continue
+        t["_is_exam"] = _compute_is_exam(t)
+        t["_tags_str"] = _format_tags(t)
+        if t["_is_exam"]:
+            if _within(due, end_ms_exam):
+                merged.append(t)
+        else:
+            if _within(due, end_ms_other):
+                merged.append(t)
+    return merged
+
+# ---------- Groq AI summary (optional) ----------
+def _short_snapshot(t, today_date, tz):
+    label, due_dt = human_label_and_dt(t["_due_int"], today_date, tz)
+    name = t.get("name", "(no title)")
+    status = t.get("status", {}).get("status", "unknown")
+    is_exam = "yes" if _is_exam_task(t) else "no"
+    return f"- {name} | due: {label} ({_iso_date(due_dt)}) | status: {status} | exam: {is_exam}"
+
+def ai_summarize_tasks(tasks, now_local, tz):
+    key = os.getenv("GROQ_API_KEY")
+    if not key or not tasks:
+        return None
+    # Not worth an external round trip for a handful of tasks
+    try:
+        min_tasks = int(os.getenv("AI_SUMMARY_MIN_TASKS") or 3)
+    except ValueError:
+        min_tasks = 3
+    if len(tasks) < min_tasks:
+        return None
+    try:
+        # Imported only when a summary will actually be requested
+        from groq import Groq
+        # Bounded so a slow Groq response can't hold up the Discord post
+        client = Groq(api_key=key).with_options(timeout=10.0)
+
+        today = now_local.strftime("%Y-%m-%d (%a)")
+
+        # Build compact snapshot
+        today_date = now_local.date()
+        items = [_short_snapshot(t, today_date, tz) for t in tasks[:40]]  # limit size
+        items_text = "\n".join(items)
+
+        # Language
+        lang = (os.getenv("AI_SUMMARY_LANG") or "EN").upper()
+        if lang == "TH":
+            instructions = (
+                "สรุปงานภายใน 7–14 วันเป็น 3–5 bullet "
+                "โดยให้ความสำคัญสูงสุดกับงานที่เป็นการสอบ (exam=yes) "
+                "จัดลำดับตามความเร่งด่วน แล้วตามด้วยงานอื่น "
+                "ปิดท้ายด้วยข้อความให้กำลังใจ 1 บรรทัด"
+            )
+        else:
+            instructions = (
+                "Summarize tasks due in the next 7–14 days in 3–5 bullets. "
+                "Focus heavily on exam tasks (exam=yes) first, then other urgent work. "
+                "Highlight deadlines and risks. End with one short motivational line."
+            )
+
+        # Full prompt
+        big_paragraph = (
+            f"Today: {today}\n"
+            f"Tasks list (title | due | status | exam?):\n{items_text}\n\n"
+            f"Instructions: {instructions}"
+        )
+
+        resp = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": big_paragraph}],
+            temperature=0.4,
+            max_tokens=320,
+        )
+        return resp.choices[0].message.content.strip()
+    except Exception:
+        return None
+
+# ---------- Message builder ----------
+def build_discord_message(tasks, now_local: datetime, tz: tzinfo, days_ahead: int, exam_days_ahead: int):
+    if not tasks:
+        content = (
+            "===================================\n"
+            f"📅 Daily Check ({now_local.strftime('%Y-%m-%d')}) (0 works)\n"
+            f"- No tasks due soon.\n"
+            "==================================="
+        )
+        return {"content": content, "blocks": [content]}
+
+    # Sort tasks by due date (the only sort on this path; fetch_due_tasks already
+    # returns due-date order, so this is a linear pass), then partition in one
+    # pass: exams vs others (by tag #exam)
+    tasks_sorted = sorted(tasks, key=_due_key)
+    exams, others = [], []
+    for t in tasks_sorted:
+        (exams if _is_exam_task(t) else others).append(t)
+
+    # --- AI Summary (optional) ---
+    ai_summary = ai_summarize_tasks(tasks_sorted, now_local, tz)
+
+    # Compose; `cuts` marks indexes in `parts` where a Discord message may be split
+    today_date = now_local.date()
+    parts = [
+        "===================================\n",
+        f"📅 Daily Check ({now_local.strftime('%Y-%m-%d')}) ({len(tasks_sorted)} works)\n\n",
+    ]
+    cuts = [len(parts)]
+    if ai_summary:
+        parts.extend(("🤖 **AI Summary**\n", ai_summary, "\n--------------------------------------\n"))
+        cuts.append(len(parts))
+
+    parts.append(f"📚 Upcoming Exams (next {exam_days_ahead} days) — [{len(exams)} exams]\n")
+    _emit_section(parts, cuts, exams, today_date, tz)
+    cuts.append(len(parts))
+    parts.append("\n--------------------------------------\n")
+    parts.append(f"🗓️ Work due Soon (next {days_ahead} days) — [{len(others)} works]\n")
+    _emit_section(parts, cuts, others, today_date, tz)
+    parts.append("\n===================================")
+
+    bounds = [0, *cuts, len(parts)]
+    blocks = ["".join(parts[a:b]) for a, b in zip(bounds, bounds[1:])]
+    return {"content": "".join(blocks), "blocks": blocks}
+
+# ---------- Safe Discord sender ----------
+def send_discord_message(webhook: str, blocks):
+    """Post `blocks` (from build_discord_message) as few <=MAX-char messages as possible.
+
+    Blocks are packed greedily and never split unless one alone is too long.
+    """
+    MAX = 1900  # keep well under 2000
+
+    def chunks_by_block(blocks):
+        out, cur, cur_len = [], [], 0
+        for b in blocks:
+            if cur and cur_len + len(b) > MAX:
+                out.append("".join(cur).rstrip("\n"))
+                cur, cur_len = [], 0
+            if not cur:
+                b = b.lstrip("\n")
+                # if a single block is too long, split by lines
+                if len(b) > MAX:
+                    out.extend(chunks_by_line(b))
+                    continue
+            cur.append(b)
+            cur_len += len(b)
+        if cur:
+            out.append("".join(cur).rstrip("\n"))
+        return out
+
+    def chunks_by_line(s: str):
+        lines = s.split("\n")
+        out, cur = [], ""
+        for ln in lines:
+            candidate = (ln if cur == "" else cur + "\n" + ln)
+            if len(candidate) <= MAX:
+                cur = candidate
+            else:
+                if cur:
+                    out.append(cur)
+                # last resort split, but try hard not to cut inside <...>
+                out.extend(safe_hard_split(ln, MAX))
+                cur = ""
+        if cur:
+            out.append(cur)
+        return out
+
+    def safe_hard_split(line: str, max_len: int):
+        # avoid splitting inside <...> by finding URL spans first
+        spans = [(m.start(), m.end()) for m in re.finditer(r"<https?://[^>\s]+>", line)]
+        cuts = []
+        i = 0
+        while i < len(line):
+            j = min(i + max_len, len(line))
+            # if the cut falls inside a URL span, move j to the end of that span
+            for a, b in spans:
+                if a < j < b:
+                    j = b
+                    break
+            cuts.append(line[i:j])
+            i = j
+        return cuts
+
+    def post(part: str, attempts: int = 5):
+        for attempt in range(attempts):
+            # Drop the session-level ClickUp token so it is never sent to Discord
+            resp = _SESSION.post(webhook, json={"content": part}, headers={"Authorization": None}, timeout=30)
+            if resp.status_code != 429 or attempt == attempts - 1:
+                break
+            # Rate limited: nothing was posted, so waiting and resending is safe
+            try:
+                delay = float(resp.headers.get("Retry-After") or 1)
+            except ValueError:
+                delay = 1.0
+            time.sleep(min(delay, 30))
+        return resp
+
+    for part in chunks_by_block(blocks):
+        resp = post(part)
+        if not (200 <= resp.status_code < 300):
+            print(f"Discord webhook failed: {resp.status_code} {resp.text}")
+            sys.exit(4)
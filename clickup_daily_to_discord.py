@@ -8,287 +8,19 @@
 
 import os, sys
 from datetime import datetime, timedelta, timezone
-from zoneinfo import ZoneInfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import requests
 
-API_BASE = "https://api.clickup.com/api/v2"
+from clickup_core import *
 
-# ---------- .env loader ----------
-def load_dotenv(path: str = ".env"):
-    if not os.path.exists(path):
-        return
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            k, v = line.split("=", 1)
-            os.environ.setdefault(k.strip(), v.strip())
+try:
+    _TZ = ZoneInfo("Asia/Bangkok")
+except ZoneInfoNotFoundError:
+    # No tzdata available; Bangkok is a fixed UTC+7 with no DST
+    _TZ = timezone(timedelta(hours=7))
 
-def env_bool(name: str, default: bool = False) -> bool:
-    val = os.getenv(name)
-    if val is None:
-        return default
-    return val.strip().lower() in ("1", "true", "yes", "y", "on")
-
-# ---------- ClickUp helpers ----------
-def get_my_user_id(headers):
-    resp = requests.get(f"{API_BASE}/user", headers=headers, timeout=30)
-    resp.raise_for_status()
-    return resp.json()["user"]["id"]
-
-def get_teams(headers):
-    resp = requests.get(f"{API_BASE}/team", headers=headers, timeout=30)
-    resp.raise_for_status()
-    return resp.json().get("teams", [])
-
-def fetch_due_tasks(headers, team_id, due_start_ms, due_end_ms, assignee_id=None, include_closed=False, page_limit=100):
-    """Fetch tasks, then manually filter by due_date between [due_start_ms, due_end_ms]."""
-    tasks = []
-    page = 0
-    while True:
-        params = {
-            "include_closed": "true" if include_closed else "false",
-            "subtasks": "true",
-            "page": page,
-        }
-        if assignee_id:
-            params["assignees[]"] = str(assignee_id)
-
-        resp = requests.get(f"{API_BASE}/team/{team_id}/task", headers=headers, params=params, timeout=60)
-        resp.raise_for_status()
-        data = resp.json()
-        batch = data.get("tasks", [])
-        if not batch:
-            break
-
-        for t in batch:
-            if not t.get("due_date"):
-                continue
-            try:
-                due = int(t["due_date"])
-            except Exception:
-                continue
-            if due_start_ms <= due <= due_end_ms:
-                tasks.append(t)
-
-        if len(batch) < page_limit:
-            break
-        page += 1
-
-    return tasks
-
-def human_label_and_dt(due_ms: int, now_local: datetime, tz: ZoneInfo):
-    due_dt = datetime.fromtimestamp(int(due_ms) / 1000, tz)
-    delta_days = (due_dt.date() - now_local.date()).days
-    if delta_days < 0:
-        label = f"overdue ({abs(delta_days)}d)"
-    elif delta_days == 0:
-        label = "today"
-    elif delta_days == 1:
-        label = "tomorrow"
-    else:
-        label = f"in {delta_days} days"
-    return label, due_dt
-
-def _is_exam_task(t) -> bool:
-    # Uses ClickUp "tags" (not custom field) to detect exams
-    tags = t.get("tags", [])
-    return any((tg.get("name") or "").lower() == "exam" for tg in tags)
-
-def _within(due_ms: int, end_ms: int) -> bool:
-    return due_ms <= end_ms
-
-def _format_task_block(t, now_local: datetime, tz: ZoneInfo):
-    label, due_dt = human_label_and_dt(t["due_date"], now_local, tz)
-    weekday = due_dt.strftime('%a')  # Mon/Tue/Wed
-    name = t.get("name", "(no title)")
-    url = t.get("url") or f"https://app.clickup.com/t/{t.get('id')}"
-    status = t.get("status", {}).get("status", "unknown")
-    tag_list = t.get("tags", [])
-    tags_str = " ".join(f"#{tag['name']}" for tag in tag_list) if tag_list else "-"
-    icon = "🎓" if _is_exam_task(t) else "📝"
-    return (
-        f"{icon} {name}\n"
-        f"   • Status: {status}\n"
-        f"   • Tags: {tags_str}\n"
-        f"   • Due: {label} ({due_dt.strftime('%Y-%m-%d')} {weekday})\n"
-        f"   • Link: <{url}>"
-    )
-
-# ---------- Groq AI summary (optional) ----------
-def _short_snapshot(t, now_local, tz):
-    label, due_dt = human_label_and_dt(t["due_date"], now_local, tz)
-    name = t.get("name", "(no title)")
-    status = t.get("status", {}).get("status", "unknown")
-    is_exam = "yes" if _is_exam_task(t) else "no"
-    return f"- {name} | due: {label} ({due_dt.strftime('%Y-%m-%d')}) | status: {status} | exam: {is_exam}"
-
-def ai_summarize_tasks(tasks, now_local, tz):
-    key = os.getenv("GROQ_API_KEY")
-    if not key or not tasks:
-        return None
-    try:
-        from groq import Groq
-        client = Groq(api_key=key)
-
-        today = now_local.strftime("%Y-%m-%d (%a)")
-
-        # Build compact snapshot
-        items = []
-        for t in tasks[:40]:  # limit size
-            label, due_dt = human_label_and_dt(t["due_date"], now_local, tz)
-            name = t.get("name", "(no title)")
-            status = t.get("status", {}).get("status", "unknown")
-            is_exam = "yes" if _is_exam_task(t) else "no"
-            items.append(f"- {name} | due: {label} ({due_dt.strftime('%Y-%m-%d')}) | status: {status} | exam: {is_exam}")
-        items_text = "\n".join(items)
-
-        # Language
-        lang = (os.getenv("AI_SUMMARY_LANG") or "EN").upper()
-        if lang == "TH":
-            instructions = (
-                "สรุปงานภายใน 7–14 วันเป็น 3–5 bullet "
-                "โดยให้ความสำคัญสูงสุดกับงานที่เป็นการสอบ (exam=yes) "
-                "จัดลำดับตามความเร่งด่วน แล้วตามด้วยงานอื่น "
-                "ปิดท้ายด้วยข้อความให้กำลังใจ 1 บรรทัด"
-            )
-        else:
-            instructions = (
-                "Summarize tasks due in the next 7–14 days in 3–5 bullets. "
-                "Focus heavily on exam tasks (exam=yes) first, then other urgent work. "
-                "Highlight deadlines and risks. End with one short motivational line."
-            )
-
-        # Full prompt
-        big_paragraph = (
-            f"Today: {today}\n"
-            f"Tasks list (title | due | status | exam?):\n{items_text}\n\n"
-            f"Instructions: {instructions}"
-        )
-
-        resp = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": big_paragraph}],
-            temperature=0.4,
-            max_tokens=320,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception:
-        return None
-
-# ---------- Message builder ----------
-def build_discord_message(tasks, now_local: datetime, tz: ZoneInfo, days_ahead: int, exam_days_ahead: int):
-    if not tasks:
-        content = (
-            "===================================\n"
-            f"📅 Daily Check ({now_local.strftime('%Y-%m-%d')}) (0 works)\n"
-            f"- No tasks due soon.\n"
-            "==================================="
-        )
-        return {"content": content}
-
-    # Sort tasks by due date
-    tasks_sorted = sorted(tasks, key=lambda t: int(t["due_date"]))
-
-    # Partition: exams vs others (by tag #exam)
-    exams = [t for t in tasks_sorted if _is_exam_task(t)]
-    others = [t for t in tasks_sorted if not _is_exam_task(t)]
-
-    # Build blocks
-    exam_blocks  = [_format_task_block(t, now_local, tz) for t in exams]
-    other_blocks = [_format_task_block(t, now_local, tz) for t in others]
-    total_count  = len(exam_blocks) + len(other_blocks)
-
-    # --- AI Summary (optional) ---
-    ai_summary = ai_summarize_tasks(tasks_sorted, now_local, tz)
-
-    # Compose
-    sections = []
-    if ai_summary:
-        sections.append("🤖 **AI Summary**")
-        sections.append(ai_summary)
-        sections.append("--------------------------------------")
-
-    sections += [
-        f"📚 Upcoming Exams (next {exam_days_ahead} days) — [{len(exam_blocks)} exams]",
-        ("\n\n".join(exam_blocks) if exam_blocks else "   • None"),
-        "--------------------------------------",
-        f"🗓️ Work due Soon (next {days_ahead} days) — [{len(other_blocks)} works]",
-        ("\n\n".join(other_blocks) if other_blocks else "   • None"),
-    ]
-    body = "\n".join(sections).strip()
-
-    text = (
-        "===================================\n"
-        f"📅 Daily Check ({now_local.strftime('%Y-%m-%d')}) ({total_count} works)\n\n"
-        + body +
-        "\n==================================="
-    )
-    return {"content": text}
-
-# ---------- Safe Discord sender ----------
-def send_discord_message(webhook: str, text: str):
-    MAX = 1900  # keep well under 2000
-
-    def chunks_by_paragraph(s: str):
-        paras = s.split("\n\n")
-        out, cur = [], ""
-        for p in paras:
-            block = (p if cur == "" else cur + "\n\n" + p)
-            if len(block) <= MAX:
-                cur = block
-            else:
-                if cur:
-                    out.append(cur)
-                # if a single paragraph is too long, split by lines
-                if len(p) > MAX:
-                    out.extend(chunks_by_line(p))
-                    cur = ""
-                else:
-                    cur = p
-        if cur:
-            out.append(cur)
-        return out
-
-    def chunks_by_line(s: str):
-        lines = s.split("\n")
-        out, cur = [], ""
-        for ln in lines:
-            candidate = (ln if cur == "" else cur + "\n" + ln)
-            if len(candidate) <= MAX:
-                cur = candidate
-            else:
-                if cur:
-                    out.append(cur)
-                # last resort split, but try hard not to cut inside <...>
-                out.extend(safe_hard_split(ln, MAX))
-                cur = ""
-        if cur:
-            out.append(cur)
-        return out
-
-    def safe_hard_split(line: str, max_len: int):
-        # avoid splitting inside <...> by finding URL spans first
-        spans = [(m.start(), m.end()) for m in re.finditer(r"<https?://[^>\s]+>", line)]
-        cuts = []
-        i = 0
-        while i < len(line):
-            j = min(i + max_len, len(line))
-            # if the cut falls inside a URL span, move j to the end of that span
-            for a, b in spans:
-                if a < j < b:
-                    j = b
-                    break
-            cuts.append(line[i:j])
-            i = j
-        return cuts
-
-    for part in chunks_by_paragraph(text):
-        resp = requests.post(webhook, json={"content": part}, timeout=30)
-        if not (200 <= resp.status_code < 300):
-            print(f"Discord webhook failed: {resp.status_code} {resp.text}")
-            sys.exit(4)
+DAY_MS = 86_400_000
+EOD_MS = (23 * 3600 + 59 * 60 + 59) * 1000  # 23:59:59 from midnight
 
 # ---------- Main ----------
 def main():
@@ -306,10 +38,15 @@ def main():
         print("ERROR: Please set CLICKUP_TOKEN and DISCORD_WEBHOOK_URL (in environment or .env).")
         sys.exit(2)
 
-    headers = {"Authorization": token}
+    set_clickup_token(token)
+    try:
+        _run(team_id, webhook, days_ahead, exam_days_ahead, only_me, include_closed)
+    finally:
+        close_session()
 
+def _run(team_id, webhook, days_ahead, exam_days_ahead, only_me, include_closed):
     if not team_id:
-        teams = get_teams(headers)
+        teams = get_teams()
         if not teams:
             print("ERROR: No Workspaces (teams) found for your token.")
             sys.exit(2)
@@ -318,32 +55,28 @@ def main():
             print(f"  {t.get('id')}  -  {t.get('name')}")
         sys.exit(1)
 
-    tz = ZoneInfo("Asia/Bangkok")
+    tz = _TZ
     now_local = datetime.now(tz)
 
     # Start from midnight today
     start_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
 
-    # Windows
-    end_local_other = (start_local + timedelta(days=days_ahead)).replace(hour=23, minute=59, second=59, microsecond=0)
-    end_local_exam  = (start_local + timedelta(days=exam_days_ahead)).replace(hour=23, minute=59, second=59, microsecond=0)
-    end_local_fetch = end_local_exam  # fetch the larger window once
-
+    # Windows (plain ms arithmetic is exact: Asia/Bangkok has no DST)
     start_ms     = int(start_local.astimezone(timezone.utc).timestamp() * 1000)
-    end_ms_fetch = int(end_local_fetch.astimezone(timezone.utc).timestamp() * 1000)
-    end_ms_other = int(end_local_other.astimezone(timezone.utc).timestamp() * 1000)
-    end_ms_exam  = int(end_local_exam.astimezone(timezone.utc).timestamp() * 1000)
+    end_ms_other = start_ms + days_ahead * DAY_MS + EOD_MS
+    end_ms_exam  = start_ms + exam_days_ahead * DAY_MS + EOD_MS
+    end_ms_fetch = end_ms_exam  # fetch the larger window once
 
     assignee_id = None
     if only_me:
         try:
-            assignee_id = get_my_user_id(headers)
+            assignee_id = get_my_user_id()
         except Exception as e:
             print(f"WARNING: Couldn't get your user id, continuing without assignee filter. Details: {e}")
 
     # Fetch & window-filter per task type
     try:
-        all_tasks = fetch_due_tasks(headers, team_id, start_ms, end_ms_fetch, assignee_id, include_closed)
+        all_tasks = fetch_due_tasks(team_id, start_ms, end_ms_fetch, assignee_id, include_closed)
     except requests.HTTPError as e:
         print("HTTP error from ClickUp:", e.response.status_code, e.response.text)
         sys.exit(3)
@@ -351,22 +84,11 @@ def main():
         print("Unexpected error fetching tasks:", repr(e))
         sys.exit(3)
 
-    merged = []
-    for t in all_tasks:
-        try:
-            due = int(t["due_date"])
-        except Exception:
-            continue
-        if _is_exam_task(t):
-            if _within(due, end_ms_exam):
-                merged.append(t)
-        else:
-            if _within(due, end_ms_other):
-                merged.append(t)
+    merged = window_tasks(all_tasks, end_ms_other, end_ms_exam)
 
     # Build & send
     payload = build_discord_message(merged, now_local, tz, days_ahead, exam_days_ahead)
-    send_discord_message(webhook, payload["content"])
+    send_discord_message(webhook, payload["blocks"])
     print(f"Sent {len(merged)} task(s) to Discord.")
 
 if __name__ == "__main__":